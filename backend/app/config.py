@@ -1,4 +1,6 @@
 """Application configuration."""
+from ipaddress import ip_network
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -20,6 +22,56 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: list[str] = ["http://localhost:5173", "http://localhost:3000"]
     
+    # Rate limiting: requests per minute per client (user id from the JWT,
+    # else client IP). Each listed route has its own bucket; all other /api
+    # paths share the default bucket
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_DEFAULT_PER_MINUTE: int = 120
+    RATE_LIMIT_ROUTES: dict[str, int] = {
+        "/api/auth/login": 10,
+        "/api/auth/register": 5,
+        "/api/wallets/deposit": 30,
+        "/api/wallets/withdraw": 30,
+    }
+    # Unauthenticated routes; always keyed by client IP, tokens are ignored
+    RATE_LIMIT_PUBLIC_ROUTES: list[str] = ["/api/auth/login", "/api/auth/register"]
+    RATE_LIMIT_MAX_KEYS: int = 10000
+    # Proxy addresses/CIDRs whose X-Forwarded-For is trusted when resolving
+    # the client IP; empty means key on the direct peer address
+    TRUSTED_PROXIES: list[str] = []
+    
+    # Max in-flight requests per route (across all clients) before shedding
+    # load with 503, and the Retry-After sent with it
+    CONCURRENCY_LIMITS: dict[str, int] = {
+        "/api/auth/login": 8,
+        "/api/auth/register": 8,
+        "/api/wallets/deposit": 16,
+        "/api/wallets/withdraw": 16,
+    }
+    LOAD_SHED_RETRY_AFTER_SECONDS: int = 1
+    
+    @field_validator("RATE_LIMIT_DEFAULT_PER_MINUTE", "RATE_LIMIT_MAX_KEYS", "LOAD_SHED_RETRY_AFTER_SECONDS")
+    @classmethod
+    def _positive(cls, value: int) -> int:
+        if value <= 0:
+            raise ValueError("must be positive")
+        return value
+    
+    @field_validator("RATE_LIMIT_ROUTES", "CONCURRENCY_LIMITS")
+    @classmethod
+    def _positive_limits(cls, value: dict[str, int]) -> dict[str, int]:
+        for path, limit in value.items():
+            if limit <= 0:
+                raise ValueError(f"limit for {path} must be positive")
+        return value
+    
+    @field_validator("TRUSTED_PROXIES")
+    @classmethod
+    def _valid_networks(cls, value: list[str]) -> list[str]:
+        for proxy in value:
+            ip_network(proxy, strict=False)
+        return value
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
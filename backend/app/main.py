@@ -4,6 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
 from app.database import engine, Base, get_db
+from app.rate_limit import RateLimiter
 from app.routers import auth, wallets, credit_line, transactions
 
 # Create tables
@@ -16,6 +17,11 @@ app = FastAPI(
 )
 
 settings = get_settings()
+
+# Rate limiting runs inside CORS so rejected requests still carry CORS headers
+rate_limiter = RateLimiter(settings)
+app.middleware("http")(rate_limiter)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
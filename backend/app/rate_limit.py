@@ -0,0 +1,144 @@
+"""Rate limiting and load shedding."""
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from ipaddress import ip_address, ip_network
+from typing import Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from app.auth import decode_token
+from app.config import Settings
+
+
+class RateLimitBackend(ABC):
+    """Token bucket store.
+
+    Subclass this to share buckets between workers (e.g. backed by Redis).
+    ``take`` returns 0 when a token was consumed, otherwise the number of
+    seconds until one becomes available.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, capacity: int) -> float:
+        ...
+
+
+class InMemoryBackend(RateLimitBackend):
+    """Per-process token buckets with LRU eviction.
+
+    Also serves as the local stand-in for a shared backend in tests; pass
+    a fake ``clock`` to control refills.
+    """
+
+    def __init__(self, max_keys: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, capacity: int) -> float:
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class RateLimiter:
+    """Per-client token buckets plus per-route concurrency caps.
+
+    Paths in ``RATE_LIMIT_ROUTES`` get their own bucket per client; every
+    other ``/api`` path draws from a single default bucket per client.
+    """
+
+    def __init__(self, settings: Settings, backend: Optional[RateLimitBackend] = None):
+        self.settings = settings
+        self.backend = backend or InMemoryBackend(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+        self._in_flight: dict[str, int] = {}
+        self._trusted_proxies = [ip_network(proxy, strict=False) for proxy in settings.TRUSTED_PROXIES]
+
+    def _is_trusted_proxy(self, host: str) -> bool:
+        try:
+            address = ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self._trusted_proxies)
+
+    def client_ip(self, request: Request) -> str:
+        """Resolve the client IP, walking X-Forwarded-For from the right.
+
+        Only hops appended by trusted proxies are skipped, so entries a client
+        puts in the header itself are never used.
+        """
+        host = request.client.host if request.client else "unknown"
+        if not self._is_trusted_proxy(host):
+            return host
+        hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not self._is_trusted_proxy(hop):
+                return hop
+        return hops[0] if hops else host
+
+    def client_key(self, request: Request) -> str:
+        """Identify the caller by JWT subject, falling back to client IP.
+
+        Public routes always use the IP so extra accounts cannot buy extra
+        login or registration attempts.
+        """
+        if request.url.path in self.settings.RATE_LIMIT_PUBLIC_ROUTES:
+            return f"ip:{self.client_ip(request)}"
+        auth = request.headers.get("authorization", "")
+        if auth.lower().startswith("bearer "):
+            payload = decode_token(auth[7:])
+            if payload and payload.get("sub") is not None:
+                return f"user:{payload['sub']}"
+        return f"ip:{self.client_ip(request)}"
+
+    async def __call__(self, request: Request, call_next):
+        path = request.url.path
+        if not self.settings.RATE_LIMIT_ENABLED or not path.startswith("/api/"):
+            return await call_next(request)
+
+        # Unlisted paths share one bucket per client so arbitrary URLs cannot
+        # mint keys and evict the per-route buckets
+        if path in self.settings.RATE_LIMIT_ROUTES:
+            per_minute = self.settings.RATE_LIMIT_ROUTES[path]
+            key = f"{path}:{self.client_key(request)}"
+        else:
+            per_minute = self.settings.RATE_LIMIT_DEFAULT_PER_MINUTE
+            key = f"default:{self.client_key(request)}"
+        retry_after = await self.backend.take(key, per_minute / 60.0, per_minute)
+        if retry_after > 0:
+            return _reject(429, "Too many requests", retry_after)
+
+        limit = self.settings.CONCURRENCY_LIMITS.get(path)
+        if limit is None:
+            return await call_next(request)
+        if self._in_flight.get(path, 0) >= limit:
+            return _reject(503, "Server busy, try again later", self.settings.LOAD_SHED_RETRY_AFTER_SECONDS)
+
+        self._in_flight[path] = self._in_flight.get(path, 0) + 1
+        try:
+            return await call_next(request)
+        finally:
+            self._in_flight[path] -= 1
+
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
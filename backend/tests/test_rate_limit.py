@@ -0,0 +1,186 @@
+"""Rate limiting tests."""
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.config import Settings
+from app.rate_limit import InMemoryBackend, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def take(backend: InMemoryBackend, key: str, rate: float = 1.0, capacity: int = 2) -> float:
+    return asyncio.run(backend.take(key, rate, capacity))
+
+
+def with_peer(app, host: str):
+    """Serve ``app`` as if every connection came from ``host``."""
+    async def wrapped(scope, receive, send):
+        if scope["type"] == "http":
+            scope = {**scope, "client": (host, 50000)}
+        await app(scope, receive, send)
+    return wrapped
+
+
+def make_client(peer: str = None, started: threading.Event = None, release: threading.Event = None, **overrides):
+    settings = Settings(**{
+        "RATE_LIMIT_DEFAULT_PER_MINUTE": 100,
+        "RATE_LIMIT_ROUTES": {"/api/login": 2, "/api/deposit": 2},
+        "RATE_LIMIT_PUBLIC_ROUTES": ["/api/login"],
+        "CONCURRENCY_LIMITS": {"/api/slow": 1, "/api/boom": 1},
+        **overrides,
+    })
+    limiter = RateLimiter(settings, InMemoryBackend(clock=FakeClock()))
+    app = FastAPI()
+    app.middleware("http")(limiter)
+
+    @app.post("/api/login")
+    def login():
+        return {"ok": True}
+
+    @app.post("/api/deposit")
+    def deposit():
+        return {"ok": True}
+
+    @app.get("/api/slow")
+    def slow():
+        if started is not None:
+            started.set()
+        if release is not None:
+            release.wait(timeout=5)
+        return {"ok": True}
+
+    @app.get("/api/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    return TestClient(with_peer(app, peer) if peer else app), limiter
+
+
+def test_bucket_refills_and_reports_retry_after():
+    clock = FakeClock()
+    backend = InMemoryBackend(clock=clock)
+    assert take(backend, "k") == 0
+    assert take(backend, "k") == 0
+    assert take(backend, "k") == pytest.approx(1.0)
+
+    clock.now = 0.5
+    assert take(backend, "k") == pytest.approx(0.5)
+
+    clock.now = 1.0
+    assert take(backend, "k") == 0
+
+
+def test_bucket_evicts_least_recently_used_key():
+    backend = InMemoryBackend(max_keys=2, clock=FakeClock())
+    take(backend, "a", capacity=1)
+    take(backend, "b", capacity=1)
+    take(backend, "a", capacity=1)
+    take(backend, "c", capacity=1)
+
+    assert list(backend._buckets) == ["a", "c"]
+    # "b" was evicted, so it starts again with a full bucket
+    assert take(backend, "b", capacity=1) == 0
+
+
+def test_rate_limit_returns_429_with_retry_after():
+    client, _ = make_client()
+    assert client.post("/api/login").status_code == 200
+    assert client.post("/api/login").status_code == 200
+
+    response = client.post("/api/login")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+
+
+def test_rate_limit_keys_on_jwt_sub_then_ip():
+    client, _ = make_client(RATE_LIMIT_ROUTES={"/api/deposit": 1})
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+    bob = {"Authorization": f"Bearer {create_access_token({'sub': '2'})}"}
+
+    assert client.post("/api/deposit", headers=alice).status_code == 200
+    assert client.post("/api/deposit", headers=alice).status_code == 429
+    assert client.post("/api/deposit", headers=bob).status_code == 200
+    assert client.post("/api/deposit").status_code == 200
+    assert client.post("/api/deposit", headers={"Authorization": "Bearer junk"}).status_code == 429
+
+
+def test_public_routes_ignore_tokens():
+    client, _ = make_client(RATE_LIMIT_ROUTES={"/api/login": 1})
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+    bob = {"Authorization": f"Bearer {create_access_token({'sub': '2'})}"}
+
+    assert client.post("/api/login", headers=alice).status_code == 200
+    assert client.post("/api/login", headers=bob).status_code == 429
+    assert client.post("/api/login").status_code == 429
+
+
+def test_unlisted_paths_share_default_bucket():
+    client, limiter = make_client(RATE_LIMIT_DEFAULT_PER_MINUTE=2)
+    assert client.get("/api/junk1").status_code == 404
+    assert client.get("/api/junk2").status_code == 404
+    assert client.get("/api/junk3").status_code == 429
+    assert client.post("/api/login").status_code == 200
+    assert [key.split(":")[0] for key in limiter.backend._buckets] == ["default", "/api/login"]
+
+
+def test_spoofed_forwarded_for_does_not_reset_bucket():
+    client, _ = make_client(
+        peer="172.28.0.10", TRUSTED_PROXIES=["172.28.0.10"], RATE_LIMIT_ROUTES={"/api/login": 1}
+    )
+    # nginx appends the real peer to whatever the client sent
+    assert client.post("/api/login", headers={"X-Forwarded-For": "1.1.1.1, 203.0.113.7"}).status_code == 200
+    assert client.post("/api/login", headers={"X-Forwarded-For": "2.2.2.2, 203.0.113.7"}).status_code == 429
+    assert client.post("/api/login", headers={"X-Forwarded-For": "203.0.113.8"}).status_code == 200
+
+
+def test_forwarded_for_ignored_from_untrusted_peer():
+    client, _ = make_client(peer="198.51.100.1", RATE_LIMIT_ROUTES={"/api/login": 1})
+    assert client.post("/api/login", headers={"X-Forwarded-For": "1.1.1.1"}).status_code == 200
+    assert client.post("/api/login", headers={"X-Forwarded-For": "2.2.2.2"}).status_code == 429
+
+
+def test_concurrency_limit_sheds_load_with_503():
+    started, release = threading.Event(), threading.Event()
+    client, limiter = make_client(started=started, release=release, LOAD_SHED_RETRY_AFTER_SECONDS=5)
+    responses = []
+    first = threading.Thread(target=lambda: responses.append(client.get("/api/slow")))
+    first.start()
+    try:
+        assert started.wait(timeout=5)
+        assert limiter._in_flight["/api/slow"] == 1
+
+        response = client.get("/api/slow")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+    finally:
+        release.set()
+        first.join(timeout=5)
+
+    assert responses[0].status_code == 200
+    assert limiter._in_flight["/api/slow"] == 0
+    assert client.get("/api/slow").status_code == 200
+
+
+def test_in_flight_count_released_after_exception():
+    client, limiter = make_client()
+    with pytest.raises(RuntimeError):
+        client.get("/api/boom")
+    assert limiter._in_flight["/api/boom"] == 0
+
+
+def test_non_positive_limits_rejected():
+    with pytest.raises(ValueError):
+        Settings(RATE_LIMIT_DEFAULT_PER_MINUTE=0)
+    with pytest.raises(ValueError):
+        Settings(RATE_LIMIT_ROUTES={"/api/auth/login": 0})